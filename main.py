@@ -1,54 +1,326 @@
 import streamlit as st
+import gzip
 import os
-import json
+import orjson
 import re
+import shutil
 from datetime import datetime
 from dotenv import load_dotenv
 # Importação atualizada para ChatOpenAI
 from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationChain
+from langchain.schema import HumanMessage, SystemMessage
+from langchain.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
 
 # --- Configurações Iniciais ---
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Nome do arquivo para armazenar o histórico de feedbacks
-FEEDBACK_HISTORY_FILE = "feedback_history.json"
+# Cache de respostas em SQLite para chamadas via invoke() — hoje, o resumidor
+# do histórico. O caminho principal de geração usa stream(), que NÃO consulta
+# este cache; a deduplicação dele é feita por sessão no clique do botão.
+set_llm_cache(SQLiteCache(database_path=".langchain.db"))
+
+# Nome do arquivo para armazenar o histórico de feedbacks (JSON-Lines
+# comprimido: um registro por linha, anexado em O(1) como novo membro gzip;
+# prosa em português comprime ~4-6x)
+FEEDBACK_HISTORY_FILE = "feedback_history.jsonl.gz"
+# Formatos antigos, convertidos na primeira execução
+LEGACY_JSONL_FILE = "feedback_history.jsonl"
+LEGACY_HISTORY_FILE = "feedback_history.json"
+
+# Quantidade de feedbacks recentes enviados na íntegra no prompt; os mais
+# antigos são condensados em um resumo rolante para manter o custo em O(K)
+RECENT_FEEDBACK_LIMIT = 5
+# Estado do resumo rolante: {"summarized_count": int, "summary": str}
+FEEDBACK_SUMMARY_FILE = "feedback_summary.json"
+
+# Quantas avaliações aparecem por página na barra lateral
+HISTORY_PAGE_SIZE = 10
+
+# Âncora literal do tópico da nota na resposta da IA; o número vem logo após
+NOTA_MARKER = "Nota geral de 0 a 10"
+# Regex pré-compilada aplicada só na janela curta depois da âncora
+NOTA_DIGITS_RE = re.compile(r"(\d+(?:\.\d+)?)")
+
+# Extrai a nota da resposta sem varrer o texto inteiro: str.find localiza a
+# âncora e a regex roda apenas nos ~120 caracteres seguintes
+def extract_nota(resposta):
+    idx = resposta.find(NOTA_MARKER)
+    if idx >= 0:
+        match = NOTA_DIGITS_RE.search(resposta, idx + len(NOTA_MARKER), idx + 120)
+        if match:
+            return float(match.group(1))
+    return "N/A"
+
+# Migração única dos formatos antigos (JSON monolítico ou JSONL sem
+# compressão) para JSONL gzipado
+def _migrate_legacy_history():
+    if os.path.exists(FEEDBACK_HISTORY_FILE):
+        return
+    tmp = FEEDBACK_HISTORY_FILE + ".tmp"
+    if os.path.exists(LEGACY_JSONL_FILE):
+        with open(LEGACY_JSONL_FILE, "rb") as src, gzip.open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp, FEEDBACK_HISTORY_FILE)
+        return
+    if not os.path.exists(LEGACY_HISTORY_FILE):
+        return
+    try:
+        with open(LEGACY_HISTORY_FILE, "rb") as f:
+            entries = orjson.loads(f.read())
+    except orjson.JSONDecodeError:
+        return
+    # Escrita atômica: um crash no meio da conversão não corrompe o histórico
+    with gzip.open(tmp, "wb") as f:
+        for entry in entries:
+            f.write(orjson.dumps(entry) + b"\n")
+    os.replace(tmp, FEEDBACK_HISTORY_FILE)
+
+# Formata uma entrada do histórico para o bloco usado no prompt
+def format_feedback_entry(index, item):
+    return (
+        f"--- Feedback {index + 1} ---\n"
+        f"Data: {item.get('data', 'N/A')}\n"
+        f"Arquivo: {item.get('nome_arquivo', 'N/A')}\n"
+        f"Nota: {item.get('nota', 'N/A')}\n"
+        f"Resumo: {item.get('resumo', 'N/A')}\n"  # Pega um resumo
+    )
+
+# Parse do arquivo cacheado pelo Streamlit e invalidado pelo mtime: reruns
+# disparados por qualquer widget não tocam o disco de novo
+@st.cache_data
+def _parse_history(path, mtime):
+    with gzip.open(path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+# Recupera o que der de um arquivo corrompido (ex.: último membro gzip
+# truncado por um crash no meio do append): lê linha a linha até o ponto da
+# falha, guarda o original como .corrupt e regrava só o prefixo legível, para
+# que os próximos appends voltem a produzir um arquivo válido
+def _salvage_history(path):
+    entries = []
+    try:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    entries.append(orjson.loads(line))
+    except (orjson.JSONDecodeError, EOFError, OSError):
+        pass
+    os.replace(path, path + ".corrupt")
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb") as f:
+        for entry in entries:
+            f.write(orjson.dumps(entry) + b"\n")
+    os.replace(tmp, path)
+    _parse_history.clear()
+    return entries
 
 # Função para carregar o histórico de feedbacks
 def load_feedback_history():
+    _migrate_legacy_history()
     if os.path.exists(FEEDBACK_HISTORY_FILE):
-        with open(FEEDBACK_HISTORY_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                st.warning("O arquivo de histórico de feedbacks está corrompido ou vazio. Criando um novo.")
-                return []
+        try:
+            return _parse_history(FEEDBACK_HISTORY_FILE, os.stat(FEEDBACK_HISTORY_FILE).st_mtime)
+        # Um crash no meio de um append deixa o último membro gzip truncado,
+        # o que levanta EOFError/BadGzipFile (OSError) em vez de erro de JSON
+        except (orjson.JSONDecodeError, EOFError, OSError):
+            entries = _salvage_history(FEEDBACK_HISTORY_FILE)
+            st.warning(
+                f"O arquivo de histórico de feedbacks estava corrompido: "
+                f"{len(entries)} avaliações foram recuperadas e o original foi "
+                f"preservado como {FEEDBACK_HISTORY_FILE}.corrupt."
+            )
+            return entries
     return []
 
-# Função para salvar o histórico de feedbacks
-def save_feedback_history(history):
-    with open(FEEDBACK_HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=4)
-
-# Inicializar modelo e memória (reutilizamos para cada sessão do Streamlit, se possível)
+# Histórico memoizado na sessão: evita tocar o disco em reruns do Streamlit
+# enquanto o arquivo não mudar (validação pelo mtime)
+def get_history():
+    mtime = os.path.getmtime(FEEDBACK_HISTORY_FILE) if os.path.exists(FEEDBACK_HISTORY_FILE) else None
+    if '_hist' not in st.session_state or st.session_state.get('_hist_mtime') != mtime:
+        st.session_state['_hist'] = load_feedback_history()
+        st.session_state['_hist_mtime'] = mtime
+    return st.session_state['_hist']
+
+# Função para anexar um novo feedback ao histórico (O(1) independente do tamanho)
+def append_feedback(entry):
+    # Cada append vira um novo membro gzip; a leitura concatenada é válida
+    with gzip.open(FEEDBACK_HISTORY_FILE, "ab") as f:
+        f.write(orjson.dumps(entry) + b"\n")
+    # Sincroniza os caches para que o próximo rerun não recarregue o arquivo.
+    # A lista em memória já recebeu a nova entrada, então a vista da barra
+    # lateral é apontada para ela em vez de ser descartada e relida do disco
+    if '_hist' in st.session_state:
+        st.session_state["_history_view"] = st.session_state['_hist']
+    else:
+        st.session_state.pop("_history_view", None)
+    _parse_history.clear()
+    st.session_state['_hist_mtime'] = os.path.getmtime(FEEDBACK_HISTORY_FILE)
+
+# Estado do resumo rolante dos feedbacks antigos
+def _load_summary_state():
+    if os.path.exists(FEEDBACK_SUMMARY_FILE):
+        try:
+            with open(FEEDBACK_SUMMARY_FILE, "rb") as f:
+                return orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            pass
+    return {"summarized_count": 0, "summary": ""}
+
+def _save_summary_state(state):
+    # Escrita atômica: o resumo anterior sobrevive a um crash no meio do write
+    tmp = FEEDBACK_SUMMARY_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(orjson.dumps(state))
+    os.replace(tmp, FEEDBACK_SUMMARY_FILE)
+
+# Modelo barato usado só para condensar feedbacks antigos
 @st.cache_resource
-def initialize_llm_and_agent(api_key, model_name="gpt-4-turbo", temperature=0.7):
+def _get_summarizer(api_key):
+    return ChatOpenAI(temperature=0.3, model="gpt-3.5-turbo", openai_api_key=api_key)
+
+# Condensa os feedbacks que saíram da janela recente no resumo rolante.
+# Uma falha aqui não pode bloquear a geração do feedback principal.
+def update_rolling_summary(history):
+    state = _load_summary_state()
+    cutoff = len(history) - RECENT_FEEDBACK_LIMIT
+    if cutoff <= state["summarized_count"]:
+        return state
+    pendentes = "\n".join(
+        format_feedback_entry(i, history[i])
+        for i in range(state["summarized_count"], cutoff)
+    )
+    prompt_resumo = (
+        "Resuma de forma concisa (no máximo 200 palavras) os pontos fortes, os pontos "
+        "fracos e a evolução do candidato, combinando o resumo atual com os novos "
+        "feedbacks abaixo.\n\n"
+        f"Resumo atual:\n{state['summary'] or '(vazio)'}\n\n"
+        f"Novos feedbacks:\n{pendentes}"
+    )
+    try:
+        resumo = _get_summarizer(OPENAI_API_KEY).invoke(prompt_resumo).content
+    except Exception:
+        return state
+    state = {"summarized_count": cutoff, "summary": resumo}
+    _save_summary_state(state)
+    return state
+
+# Monta o bloco de histórico do prompt: resumo rolante + últimas K entrevistas.
+# Só lê o estado persistido — a atualização do resumo roda no caminho de save,
+# depois da geração, para não atrasar o primeiro token do feedback principal
+def build_historico_str(history):
+    if not history:
+        return "Nenhum histórico de feedback anterior disponível."
+    state = _load_summary_state()
+    # Formata direto da lista recebida: são no máximo K entradas e a lista em
+    # session_state é a fonte de verdade entre os reruns
+    recent_block = "\n".join(
+        format_feedback_entry(i, history[i])
+        for i in range(state["summarized_count"], len(history))
+    )
+    if state["summary"]:
+        return (
+            f"Resumo de entrevistas antigas:\n{state['summary']}\n\n"
+            f"Entrevistas mais recentes:\n{recent_block}"
+        )
+    return recent_block
+
+# --- INÍCIO DO PROMPT REFINADO PARA INTERFACE ---
+# Instruções estáticas na mensagem de sistema: são enviadas uma única vez por
+# requisição e o prefixo é cacheável pela API da OpenAI. Só o histórico e a
+# transcrição variam entre os cliques (mensagem do usuário).
+SYSTEM_PROMPT = """
+Você é um avaliador profissional e imparcial de entrevistas de emprego (técnicas e comportamentais). Sua missão é fornecer um feedback detalhado e construtivo **focando exclusivamente na performance do candidato (EU)**, com base em trechos reais da entrevista transcrita enviada pelo usuário.
+
+**Instruções Cruciais para a Análise:**
+* A transcrição pode não ter identificação explícita de quem fala. Sua tarefa é **inferir quem é o candidato (EU)** com base nas perguntas típicas do recrutador e nas respostas que se alinham à uma apresentação pessoal ou profissional.
+* **Priorize a análise das MINHAS falas.** O feedback deve ser sobre a **MINHA comunicação, postura, clareza e estratégia de respostas**, e não sobre as perguntas do recrutador.
+* Ao citar trechos, **deixe claro se o trecho é uma pergunta do recrutador ou uma fala MINHA**, mas use-o apenas para contextualizar a **MINHA resposta ou a MINHA performance**.
+* Se o trecho for longo, cite apenas a parte mais relevante e adicione "..." se for truncado.
+* Certifique-se de que cada um dos 8 tópicos solicitados abaixo seja abordado de forma completa e detalhada, com exemplos.
+
+Sua resposta DEVE ser estruturada exatamente com os seguintes tópicos numerados, incluindo o número e o nome do tópico em negrito:
+
+1.  **Nota geral de 0 a 10 da MINHA performance.**
+2.  **Meus principais acertos (do candidato)**
+3.  **O que ME prejudicou (erros, falas inseguras, falta de clareza ou foco)**
+4.  **Sugira formas melhores de EU ME expressar**
+5.  **O que reorganizar no MEU roteiro de respostas**
+6.  **Evolução com base na memória de entrevistas anteriores**
+7.  **Dicas mentais e estratégias para melhorar a segurança e desempenho**
+8.  **Exemplos práticos de como responder melhor**
+
+Detalhes para cada tópico:
+
+**1. Nota geral de 0 a 10 da MINHA performance.**
+    - Forneça uma nota numérica clara.
+
+**2. Meus principais acertos (do candidato)**
+    - Com trechos específicos da transcrição que comprovem isso (ex: "Quando o candidato disse '...', demonstrou clareza/confiança/...").
+
+**3. O que ME prejudicou (erros, falas inseguras, falta de clareza ou foco)**
+    - Com trechos reais **DAS MINHAS falas** que demonstrem os pontos fracos.
+
+**4. Sugira formas melhores de EU ME expressar**
+    - Reescreva partes ruins **DAS MINHAS falas** de forma ideal, mostrando como eu poderia ter formulado a resposta.
+
+**5. O que reorganizar no MEU roteiro de respostas**
+    - Temas que deveriam vir antes, respostas que se alongam sem necessidade etc.
+
+**6. Evolução com base na memória de entrevistas anteriores**
+    - Use o histórico de feedbacks fornecido na mensagem do usuário para a análise de evolução, regressão ou estagnação em aspectos específicos **DA MINHA performance**.
+    - Se o histórico estiver vazio ou não houver dados relevantes, indique isso e ofereça dicas gerais para a próxima.
+
+**7. Dicas mentais e estratégias para melhorar a segurança e desempenho**
+    - Orientações práticas e acionáveis.
+
+**8. Exemplos práticos de como responder melhor**
+    - Dê exemplos práticos de como EU poderia responder melhor, com trechos simulados que eu poderia usar no lugar do que foi dito.
+
+⚠️ **IMPORTANTE:**
+-   Seja direto, detalhado e específico.
+-   Não resuma demais. Justifique com exemplos reais sempre que possível, **priorizando citações das MINHAS falas**.
+-   **Foço EXCLUSIVAMENTE na MINHA qualidade de comunicação, clareza, postura e estratégia como candidato.**
+-   Lembre-se: o objetivo é a MINHA evolução constante.
+"""
+
+# Mensagem do usuário pré-fatiada em torno das duas partes variáveis: a
+# montagem por clique vira um único "".join, sem reinterpolar o template
+HUMAN_PROMPT_HEAD = """
+Histórico de Feedbacks Anteriores:
+\"\"\"
+"""
+
+HUMAN_PROMPT_MID = """
+\"\"\"
+
+Transcrição da entrevista:
+\"\"\"
+"""
+
+HUMAN_PROMPT_TAIL = """
+\"\"\"
+"""
+# --- FIM DO PROMPT REFINADO PARA INTERFACE ---
+
+# Mensagem de sistema construída uma única vez na importação
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+
+# Inicializar modelo (cacheado por modelo; a temperatura é aplicada por chamada
+# via bind(), então mexer no slider não descarta o cliente)
+@st.cache_resource
+def get_llm(api_key, model_name="gpt-4o-mini"):
     if not api_key:
         st.error("Chave da API da OpenAI não encontrada. Por favor, adicione OPENAI_API_KEY no seu arquivo .env.")
         st.stop()
     try:
-        llm = ChatOpenAI(
-            temperature=temperature,
+        return ChatOpenAI(
             model=model_name,
             openai_api_key=api_key,
+            streaming=True,
             # max_tokens=1024 # Opcional: Limita o tamanho da resposta do LLM para controlar custos
         )
-        # A memória aqui é para a "conversa" atual da cadeia, não para o histórico de feedbacks
-        memory = ConversationBufferMemory(return_messages=True)
-        assistente = ConversationChain(llm=llm, memory=memory, verbose=False)
-        return assistente
     except Exception as e:
         st.error(f"Erro ao inicializar o modelo da OpenAI: {e}. Verifique sua chave da API e conexão.")
         st.stop()
@@ -67,23 +339,14 @@ st.markdown("Faça o upload da transcrição da sua entrevista e receba um feedb
 st.sidebar.header("Configurações do Modelo")
 model_name = st.sidebar.selectbox(
     "Escolha o Modelo OpenAI:",
-    ("gpt-4-turbo", "gpt-3.5-turbo"),
-    index=0 # gpt-4-turbo como padrão
+    ("gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"),
+    index=0 # gpt-4o-mini como padrão: muito mais barato e rápido para prompts longos
 )
 temperature = st.sidebar.slider(
     "Criatividade (Temperatura):",
     min_value=0.0, max_value=1.0, value=0.7, step=0.05
 )
 
-# Re-inicializa o assistente se as configurações mudarem
-if 'current_assistente' not in st.session_state or \
-   st.session_state.get('current_assistente_model') != model_name or \
-   st.session_state.get('current_assistente_temp') != temperature:
-    st.session_state.current_assistente = initialize_llm_and_agent(OPENAI_API_KEY, model_name, temperature)
-    st.session_state.current_assistente_model = model_name
-    st.session_state.current_assistente_temp = temperature
-
-
 uploaded_file = st.file_uploader(
     "Selecione o arquivo da transcrição da entrevista (.txt)",
     type="txt",
@@ -92,10 +355,16 @@ uploaded_file = st.file_uploader(
 
 feedback_placeholder = st.empty() # Placeholder para o feedback
 
+# Decodificação cacheada por conteúdo: um segundo clique com o mesmo arquivo
+# não paga a decodificação de novo
+@st.cache_data
+def _decode_transcript(raw: bytes) -> str:
+    return raw.decode("utf-8")
+
 if uploaded_file is not None:
-    transcricao = uploaded_file.read().decode("utf-8")
-    st.subheader("Pré-visualização da Transcrição:")
-    st.text_area("Conteúdo da Transcrição", transcricao, height=200, disabled=True)
+    transcricao = _decode_transcript(uploaded_file.getvalue())
+    with st.expander("Pré-visualização da Transcrição"):
+        st.text_area("Conteúdo da Transcrição", transcricao, height=200, disabled=True)
 
     if st.button("Gerar Feedback", key="generate_feedback_button"):
         if not OPENAI_API_KEY:
@@ -103,116 +372,91 @@ if uploaded_file is not None:
             st.stop()
 
         with st.spinner("Analisando a transcrição e gerando feedback... Isso pode levar alguns momentos."):
-            # Carregar histórico de feedbacks para a IA
-            historico_feedbacks = load_feedback_history()
-            historico_str = "\n".join([
-                f"--- Feedback {i+1} ---\nData: {item.get('data', 'N/A')}\nArquivo: {item.get('nome_arquivo', 'N/A')}\nNota: {item.get('nota', 'N/A')}\nResumo: {item.get('resumo', 'N/A')}\n" # Pega um resumo
-                for i, item in enumerate(historico_feedbacks)
-            ]) if historico_feedbacks else "Nenhum histórico de feedback anterior disponível."
-
-            # --- INÍCIO DO PROMPT REFINADO PARA INTERFACE ---
-            pergunta = f"""
-            Você é um avaliador profissional e imparcial de entrevistas de emprego (técnicas e comportamentais). Sua missão é fornecer um feedback detalhado e construtivo **focando exclusivamente na performance do candidato (EU)**, com base em trechos reais da entrevista transcrita abaixo.
-
-            **Instruções Cruciais para a Análise:**
-            * A transcrição pode não ter identificação explícita de quem fala. Sua tarefa é **inferir quem é o candidato (EU)** com base nas perguntas típicas do recrutador e nas respostas que se alinham à uma apresentação pessoal ou profissional.
-            * **Priorize a análise das MINHAS falas.** O feedback deve ser sobre a **MINHA comunicação, postura, clareza e estratégia de respostas**, e não sobre as perguntas do recrutador.
-            * Ao citar trechos, **deixe claro se o trecho é uma pergunta do recrutador ou uma fala MINHA**, mas use-o apenas para contextualizar a **MINHA resposta ou a MINHA performance**.
-            * Se o trecho for longo, cite apenas a parte mais relevante e adicione "..." se for truncado.
-            * Certifique-se de que cada um dos 8 tópicos solicitados abaixo seja abordado de forma completa e detalhada, com exemplos.
-
-            Sua resposta DEVE ser estruturada exatamente com os seguintes tópicos numerados, incluindo o número e o nome do tópico em negrito:
-
-            1.  **Nota geral de 0 a 10 da MINHA performance.**
-            2.  **Meus principais acertos (do candidato)**
-            3.  **O que ME prejudicou (erros, falas inseguras, falta de clareza ou foco)**
-            4.  **Sugira formas melhores de EU ME expressar**
-            5.  **O que reorganizar no MEU roteiro de respostas**
-            6.  **Evolução com base na memória de entrevistas anteriores**
-            7.  **Dicas mentais e estratégias para melhorar a segurança e desempenho**
-            8.  **Exemplos práticos de como responder melhor**
-
-            Detalhes para cada tópico:
-
-            **1. Nota geral de 0 a 10 da MINHA performance.**
-                - Forneça uma nota numérica clara.
-
-            **2. Meus principais acertos (do candidato)**
-                - Com trechos específicos da transcrição que comprovem isso (ex: "Quando o candidato disse '...', demonstrou clareza/confiança/...").
-
-            **3. O que ME prejudicou (erros, falas inseguras, falta de clareza ou foco)**
-                - Com trechos reais **DAS MINHAS falas** que demonstrem os pontos fracos.
-
-            **4. Sugira formas melhores de EU ME expressar**
-                - Reescreva partes ruins **DAS MINHAS falas** de forma ideal, mostrando como eu poderia ter formulado a resposta.
-
-            **5. O que reorganizar no MEU roteiro de respostas**
-                - Temas que deveriam vir antes, respostas que se alongam sem necessidade etc.
-
-            **6. Evolução com base na memória de entrevistas anteriores**
-                - Use o seguinte histórico de feedbacks para a análise de evolução, regressão ou estagnação em aspectos específicos **DA MINHA performance**:
-                Histórico de Feedbacks Anteriores:
-                \"\"\"
-                {historico_str}
-                \"\"\"
-                - Se o histórico estiver vazio ou não houver dados relevantes, indique isso e ofereça dicas gerais para a próxima.
-
-            **7. Dicas mentais e estratégias para melhorar a segurança e desempenho**
-                - Orientações práticas e acionáveis.
-
-            **8. Exemplos práticos de como responder melhor**
-                - Dê exemplos práticos de como EU poderia responder melhor, com trechos simulados que eu poderia usar no lugar do que foi dito.
-
-            ⚠️ **IMPORTANTE:**
-            -   Seja direto, detalhado e específico.
-            -   Não resuma demais. Justifique com exemplos reais sempre que possível, **priorizando citações das MINHAS falas**.
-            -   **Foço EXCLUSIVAMENTE na MINHA qualidade de comunicação, clareza, postura e estratégia como candidato.**
-            -   Lembre-se: o objetivo é a MINHA evolução constante.
-
-            Transcrição da entrevista:
-            \"\"\"
-            {transcricao}
-            \"\"\"
-            """
-            # --- FIM DO PROMPT REFINADO PARA INTERFACE ---
-
-            resposta_raw = st.session_state.current_assistente.predict(input=pergunta)
-
-            # Tenta extrair a nota para o histórico
-            # Ajuste a regex para ser mais flexível, caso a IA mude um pouco a frase
-            nota_match = re.search(r"Nota geral de 0 a 10 da MINHA performance.*:?\s*(\d+(\.\d+)?)", resposta_raw, re.IGNORECASE | re.DOTALL)
-            nota_final = float(nota_match.group(1)) if nota_match else "N/A"
-
-            # Salvar o feedback no histórico
-            new_feedback_entry = {
-                "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "nome_arquivo": uploaded_file.name,
-                "nota": nota_final,
-                "resumo": resposta_raw[:500] + "..." if len(resposta_raw) > 500 else resposta_raw, # Salva um resumo
-                "feedback_completo": resposta_raw
-            }
-            historico_feedbacks.append(new_feedback_entry)
-            save_feedback_history(historico_feedbacks)
+            # stream() não passa pelo cache global do langchain (só invoke/
+            # generate), então a deduplicação é feita aqui. A chave usa a
+            # transcrição (não o prompt montado): o histórico cresce a cada
+            # geração, então uma chave com o histórico embutido nunca repetiria.
+            # No hit a seção de evolução pode ficar levemente defasada — preço
+            # aceitável por pular a chamada inteira.
+            cache_key = (model_name, temperature, transcricao)
+            respostas_cache = st.session_state.setdefault("_resposta_cache", {})
+            cache_hit = cache_key in respostas_cache
+            if cache_hit:
+                resposta_raw = respostas_cache[cache_key]
+            else:
+                # Carregar histórico de feedbacks para a IA (resumo rolante + recentes)
+                historico_feedbacks = get_history()
+                historico_str = build_historico_str(historico_feedbacks)
+
+                mensagem_usuario = "".join((
+                    HUMAN_PROMPT_HEAD, historico_str,
+                    HUMAN_PROMPT_MID, transcricao,
+                    HUMAN_PROMPT_TAIL,
+                ))
+                llm = get_llm(OPENAI_API_KEY, model_name).bind(temperature=temperature)
+                mensagens = [SYSTEM_MESSAGE, HumanMessage(content=mensagem_usuario)]
+                # Streaming: o usuário vê o feedback desde o primeiro token em
+                # vez de esperar a geração completa atrás do spinner
+                partes = []
+                for chunk in llm.stream(mensagens):
+                    partes.append(chunk.content)
+                    feedback_placeholder.markdown("".join(partes))
+                resposta_raw = "".join(partes)
+                respostas_cache[cache_key] = resposta_raw
+
+                # Tenta extrair a nota para o histórico
+                nota_final = extract_nota(resposta_raw)
+
+                # Salvar o feedback no histórico (só em geração nova: um hit do
+                # cache não duplica a mesma avaliação no histórico)
+                new_feedback_entry = {
+                    "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "nome_arquivo": uploaded_file.name,
+                    "nota": nota_final,
+                    "resumo": resposta_raw[:500] + "..." if len(resposta_raw) > 500 else resposta_raw, # Salva um resumo
+                    "feedback_completo": resposta_raw
+                }
+                historico_feedbacks.append(new_feedback_entry)
+                append_feedback(new_feedback_entry)
+                # Condensa os feedbacks que saíram da janela recente agora,
+                # com a resposta já na tela: o custo fica fora do caminho até
+                # o primeiro token do próximo clique
+                update_rolling_summary(historico_feedbacks)
 
             feedback_placeholder.subheader("--- FEEDBACK DO ASSISTENTE ---")
             feedback_placeholder.markdown(resposta_raw)
 
-            st.success("Feedback gerado e salvo no histórico!")
+            if cache_hit:
+                st.info("Transcrição idêntica já avaliada nesta sessão: feedback reaproveitado do cache.")
+            else:
+                st.success("Feedback gerado e salvo no histórico!")
 
 # Exibir histórico de feedbacks (opcional)
 if st.sidebar.checkbox("Mostrar Histórico de Feedbacks Anteriores"):
-    history = load_feedback_history()
+    # Vista memoizada na sessão: reruns de widgets não relacionados nem fazem
+    # o stat do arquivo; a chave é descartada quando um novo feedback é salvo
+    if "_history_view" not in st.session_state:
+        st.session_state["_history_view"] = get_history()
+    history = st.session_state["_history_view"]
     if history:
         st.sidebar.subheader("Histórico de Avaliações")
-        for i, entry in enumerate(reversed(history)): # Mostra os mais recentes primeiro
+        total = len(history)
+        max_pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+        page = st.sidebar.number_input("Página", min_value=1, max_value=max_pages, value=1, step=1)
+        start = (page - 1) * HISTORY_PAGE_SIZE
+        # Mostra os mais recentes primeiro, só a página atual (O(10) por rerun)
+        for i in range(total - 1 - start, max(total - 1 - start - HISTORY_PAGE_SIZE, -1), -1):
+            entry = history[i]
             with st.sidebar.expander(f"Avaliação de {entry.get('data', 'N/A')} ({entry.get('nome_arquivo', 'N/A')}) - Nota: {entry.get('nota', 'N/A')}"):
-                st.write(f"**Data:** {entry.get('data', 'N/A')}")
-                st.write(f"**Arquivo:** {entry.get('nome_arquivo', 'N/A')}")
-                st.write(f"**Nota:** {entry.get('nota', 'N/A')}")
-                st.write(f"**Resumo:** {entry.get('resumo', 'N/A')}")
-                if st.button(f"Ver Feedback Completo", key=f"full_feedback_{i}"):
-                    feedback_placeholder.subheader(f"--- FEEDBACK COMPLETO DE {entry.get('data', 'N/A')} ---")
-                    feedback_placeholder.markdown(entry.get('feedback_completo', 'Feedback não disponível.'))
-                    st.toast("Feedback completo exibido na área principal.")
+                # O corpo só é montado quando o usuário pede os detalhes
+                if st.checkbox("Mostrar detalhes", key=f"show_details_{i}"):
+                    st.write(f"**Data:** {entry.get('data', 'N/A')}")
+                    st.write(f"**Arquivo:** {entry.get('nome_arquivo', 'N/A')}")
+                    st.write(f"**Nota:** {entry.get('nota', 'N/A')}")
+                    st.write(f"**Resumo:** {entry.get('resumo', 'N/A')}")
+                    if st.button(f"Ver Feedback Completo", key=f"full_feedback_{i}"):
+                        feedback_placeholder.subheader(f"--- FEEDBACK COMPLETO DE {entry.get('data', 'N/A')} ---")
+                        feedback_placeholder.markdown(entry.get('feedback_completo', 'Feedback não disponível.'))
+                        st.toast("Feedback completo exibido na área principal.")
     else:
         st.sidebar.info("Nenhum feedback anterior salvo.")
\ No newline at end of file